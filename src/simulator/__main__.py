@@ -7,13 +7,17 @@ __main__.py — Application Entry Point
 import json        # For loading the sensor configuration file
 import logging     # For structured logging throughout the application
 import os          # For reading environment variables
+import random      # For the per-sensor-type random generators
 import signal      # For handling SIGTERM (docker stop) and SIGINT (Ctrl+C)
 import sys         # For sys.exit()
-import time        # For sleep in the main loop
+import threading   # For the stop event that wakes the main loop
+import time        # For timing the main loop
 from pathlib import Path  # For clean file path handling
 
 # Import our modules
-from .sensors import create_sensor, BaseSensor  # Sensor factory and base type
+from .sensors import (  # Sensor factory, types and timestamp helper
+    create_sensor, format_timestamp, AlarmState, BaseSensor, SensorReading,
+)
 from .storage import SensorStorage               # SQLite database
 from .api import start_api_server                # REST API
 
@@ -45,38 +49,66 @@ class SensorManager:
     def __init__(self, config_path: str, storage: SensorStorage):
        
         self.storage = storage
-        self.sensors: list[BaseSensor] = []  # List of sensor instances
+        self.sensors: list[BaseSensor] = []  # Sensor instances (tuple after loading)
         self.is_collecting = False            # Health check flag
-        self._running = False                 # Controls the main loop
+        self._stop_event = threading.Event()  # Set by stop() to end the main loop
         self._start_time = time.time()        # For uptime tracking
         
+        # Write-behind buffer: readings from several cycles are stored in one
+        # SQLite transaction instead of committing once per cycle
+        self._pending: list[SensorReading] = []
+        self._pending_since = time.monotonic()
+        self.readings_stored = 0              # Total rows written, for log summaries
+        self.write_generation = 0             # Bumped after each flush (API cache key)
+        
+        # Sensors currently in alarm → their latest reading. Updated as each
+        # reading comes in, so reporting alarms never has to scan all sensors.
+        self._current_alarms: dict[BaseSensor, SensorReading] = {}
+        
         # Load sensor configuration
         self._load_config(config_path)
+        
+        # The sensor set never changes after startup. A tuple is fixed-size
+        # and slightly cheaper to iterate every cycle than a list.
+        self.sensors = tuple(self.sensors)
     
     def _load_config(self, config_path: str) -> None:
        
         try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-                # json.load(f) reads the file and parses JSON into Python dicts/lists
+            config = json.loads(Path(config_path).read_bytes())
+            # read_bytes() slurps the file in one read; json.loads parses the
+            # bytes (UTF-8) straight into Python dicts/lists
+            
+            # One random generator shared by every sensor. Sensors are read
+            # one after another on the collection thread, so they can draw
+            # from a single stream — one Mersenne Twister state (~2.5 KB)
+            # instead of one per sensor type. An optional top-level "seed" in
+            # the config makes the whole simulation reproducible run to run
+            # (useful when testing alarm logic against a known sequence).
+            rng = random.Random(config.get("seed"))
             
             # Create sensor instances from configuration
+            type_counts: dict[str, int] = {}
             for sensor_config in config.get("sensors", []):
                 try:
-                    sensor = create_sensor(sensor_config)
+                    sensor = create_sensor(sensor_config, rng)
                     self.sensors.append(sensor)
-                    logger.info(
-                        f"Created sensor: {sensor.device_id}/{sensor.tag_name} "
-                        f"({sensor.__class__.__name__})"
-                    )
+                    type_name = sensor.__class__.__name__
                     # sensor.__class__.__name__ gives us "PressureSensor",
                     # "TemperatureSensor", etc.
+                    type_counts[type_name] = type_counts.get(type_name, 0) + 1
+                    # One line per sensor is only useful when debugging —
+                    # with hundreds of sensors it dominates startup time
+                    logger.debug(
+                        f"Created sensor: {sensor.device_id}/{sensor.tag_name} ({type_name})"
+                    )
                 except (ValueError, KeyError) as e:
                     logger.error(f"Failed to create sensor: {e}. Config: {sensor_config}")
                     # Don't crash the whole app if one sensor config is bad
                     # Log the error and continue with the other sensors
             
-            logger.info(f"Loaded {len(self.sensors)} sensors from {config_path}")
+            summary = ", ".join(f"{count} {name}" for name, count in type_counts.items())
+            logger.info(f"Loaded {len(self.sensors)} sensors from {config_path} ({summary})")
         
         except FileNotFoundError:
             logger.error(f"Config file not found: {config_path}")
@@ -90,11 +122,18 @@ class SensorManager:
        
         return round(time.time() - self._start_time, 1)
     
-    def run(self, poll_interval_ms: int = 1000, cleanup_interval_hours: float = 24.0):
+    def active_alarms(self) -> list[SensorReading]:
+        """Latest reading of every sensor currently in alarm."""
+        return list(self._current_alarms.values())
+        # list() snapshots the dict in one C-level call, so the API thread
+        # can call this while the collection loop keeps updating the map
+    
+    def run(self, poll_interval_ms: int = 1000, cleanup_interval_hours: float = 24.0,
+            batch_rows: int = 5000, batch_latency_ms: int = 2000):
        
-        self._running = True
         self.is_collecting = True
-        poll_interval = poll_interval_ms / 1000.0  # Convert ms to seconds
+        poll_interval_ns = poll_interval_ms * 1_000_000  # Convert ms to integer ns
+        batch_latency = batch_latency_ms / 1000.0
         
         logger.info(
             f"Starting data collection: {len(self.sensors)} sensors, "
@@ -102,32 +141,75 @@ class SensorManager:
         )
         
         cycle_count = 0
-        last_cleanup = time.time()
+        last_cleanup = time.monotonic()
         cleanup_interval = cleanup_interval_hours * 3600  # Convert to seconds
         
-        while self._running:
-            cycle_start = time.time()
+        # Hoist attribute lookups out of the loop — local variable access is
+        # cheaper than resolving self.sensors / time.monotonic every cycle
+        sensors = self.sensors
+        sensor_count = len(sensors)
+        # Bind each sensor's read() once. Calling sensor.read(...) looks the
+        # method up on the class and builds a bound method object on every
+        # call — N times per cycle. Pre-bound pairs skip both.
+        readers = tuple((sensor, sensor.read) for sensor in sensors)
+        monotonic = time.monotonic
+        perf_counter_ns = time.perf_counter_ns
+        wall_clock = time.time
+        # time.monotonic() never jumps backwards when NTP adjusts the wall
+        # clock, so it's the right clock for interval math. Cycle pacing uses
+        # perf_counter_ns(): also monotonic, highest resolution, and integer
+        # nanoseconds so the sleep math has no float rounding.
+        # time.time() is only used for the timestamps stored with readings.
+        log_error = logger.error
+        current_alarms = self._current_alarms
+        normal = AlarmState.NORMAL
+        
+        stop_event = self._stop_event
+        
+        while not stop_event.is_set():
+            cycle_start_ns = perf_counter_ns()
             cycle_count += 1
             
             # ---- Collect readings from all sensors ----
-            readings = []
-            for sensor in self.sensors:
+            # Sample the clock once per cycle and share it with every sensor
+            # instead of each sensor calling time.time() for itself.
+            # Same for the ISO timestamp string — format it once, not N times.
+            now = wall_clock()
+            timestamp = format_timestamp(now)
+            # Preallocate one slot per sensor and fill by index — the list
+            # never has to grow (and reallocate) while the cycle runs
+            readings = [None] * sensor_count
+            count = 0
+            for sensor, read in readers:
                 try:
-                    reading = sensor.read()
-                    readings.append(reading)
+                    reading = read(now, timestamp)
                 except Exception as e:
-                    logger.error(
+                    log_error(
                         f"Error reading sensor {sensor.device_id}/{sensor.tag_name}: {e}"
                     )
                     # Don't let one broken sensor stop all collection
+                    continue
+                readings[count] = reading
+                count += 1
+                
+                # Keep the active-alarm map current: add/refresh while in
+                # alarm, drop the entry when the sensor returns to Normal
+                if reading.alarm_state is not normal:
+                    current_alarms[sensor] = reading
+                elif sensor in current_alarms:
+                    del current_alarms[sensor]
+            
+            if count < sensor_count:
+                del readings[count:]  # Drop the slots of sensors that failed
             
-            # ---- Store readings in batch ----
+            # ---- Queue readings for a batched write ----
             if readings:
-                stored = self.storage.store_batch(readings)
+                self._pending.extend(readings)
                 
                 # Log alarm states (but not every cycle — too noisy)
+                # This stays on the per-cycle path so alarms aren't delayed by batching
                 if cycle_count % 30 == 0:  # Every 30 cycles (~30 seconds)
-                    alarms = [r for r in readings if r.alarm_state != AlarmState.NORMAL]
+                    alarms = self.active_alarms()
                     if alarms:
                         for r in alarms:
                             logger.warning(
@@ -137,43 +219,67 @@ class SensorManager:
                             )
                     # Log collection summary
                     logger.info(
-                        f"Cycle {cycle_count}: {stored}/{len(readings)} readings stored, "
+                        f"Cycle {cycle_count}: {len(readings)} readings collected, "
+                        f"{self.readings_stored} stored, {len(self._pending)} pending, "
                         f"{len(alarms)} alarms active"
                     )
             
+            # ---- Flush the write buffer when it's big enough or old enough ----
+            # One commit then covers many cycles' worth of rows
+            if (len(self._pending) >= batch_rows or
+                    monotonic() - self._pending_since >= batch_latency):
+                self.flush()
+            
             # ---- Periodic cleanup ----
-            if time.time() - last_cleanup >= cleanup_interval:
+            if monotonic() - last_cleanup >= cleanup_interval:
                 self.storage.cleanup(max_hours=cleanup_interval_hours)
-                last_cleanup = time.time()
+                last_cleanup = monotonic()
             
             # ---- Wait for next cycle ----
             # Calculate how long the collection took and sleep the remainder
-            elapsed = time.time() - cycle_start
-            sleep_time = max(0, poll_interval - elapsed)
-            # max(0, ...) ensures we don't sleep negative time
-            # if collection took longer than the interval, we skip sleeping
+            elapsed_ns = perf_counter_ns() - cycle_start_ns
+            sleep_ns = poll_interval_ns - elapsed_ns
+            # If collection took longer than the interval, sleep_ns is
+            # negative or zero and we skip sleeping
             
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-            elif elapsed > poll_interval * 2:
+            if sleep_ns > 0:
+                # Event.wait() sleeps like time.sleep() but returns as soon
+                # as stop() sets the event, so shutdown never waits out the
+                # remainder of a poll interval
+                stop_event.wait(sleep_ns / 1e9)
+            elif elapsed_ns > poll_interval_ns * 2:
                 # Collection took more than 2x the interval — warn about it
                 logger.warning(
-                    f"Collection cycle took {elapsed:.2f}s "
-                    f"(interval is {poll_interval}s) — falling behind!"
+                    f"Collection cycle took {elapsed_ns / 1e9:.2f}s "
+                    f"(interval is {poll_interval_ms}ms) — falling behind!"
                 )
         
+        self.flush()  # Don't lose readings still sitting in the buffer
         self.is_collecting = False
         logger.info(f"Data collection stopped after {cycle_count} cycles")
     
+    def flush(self) -> int:
+        """Write all buffered readings to storage in one batch."""
+        pending, self._pending = self._pending, []
+        # Swap in a fresh list first so readings collected while we write
+        # go into the next batch instead of being lost
+        self._pending_since = time.monotonic()
+        if not pending:
+            return 0
+        stored = self.storage.store_batch(pending)
+        self.readings_stored += stored
+        self.write_generation += 1  # Tells the API its cached "latest" is stale
+        return stored
+    
     def stop(self):
-        """Signal the collection loop to stop."""
+        """
+        Signal the collection loop to stop.
+        
+        Safe to call from a signal handler: it only sets an event. The loop
+        wakes immediately, flushes buffered readings and returns from run().
+        """
         logger.info("Stopping data collection...")
-        self._running = False
-
-
-# We need this import for the alarm check in the run loop
-from .sensors import AlarmState
-
+        self._stop_event.set()
 
 
 
@@ -188,6 +294,8 @@ def main():
     config_path = os.environ.get("CONFIG_PATH", "/app/config/sensors.json")
     poll_interval_ms = int(os.environ.get("POLL_INTERVAL_MS", "1000"))
     cleanup_hours = float(os.environ.get("CLEANUP_HOURS", "24"))
+    batch_rows = int(os.environ.get("BATCH_ROWS", "5000"))
+    batch_latency_ms = int(os.environ.get("BATCH_LATENCY_MS", "2000"))
     
     # ---- Setup logging ----
     setup_logging(log_level)
@@ -199,6 +307,7 @@ def main():
     logger.info(f"  Config:        {config_path}")
     logger.info(f"  Poll Interval: {poll_interval_ms}ms")
     logger.info(f"  Cleanup After: {cleanup_hours}h")
+    logger.info(f"  Write Batch:   {batch_rows} rows / {batch_latency_ms}ms")
     logger.info("=" * 60)
     
     # ---- Initialize components ----
@@ -219,17 +328,11 @@ def main():
         signal_name = "SIGTERM" if signum == signal.SIGTERM else "SIGINT"
         logger.info(f"Received {signal_name} — shutting down gracefully...")
         
-        # Stop the data collection loop
+        # Only wake the collection loop here. run() returns within
+        # milliseconds after flushing buffered readings, and the teardown
+        # below main()'s run() call does the rest outside the handler —
+        # so we never close the database under a half-finished write.
         manager.stop()
-        
-        # Stop the API server
-        api_server.shutdown()
-        
-        # Close the database connection (flushes any pending writes)
-        storage.close()
-        
-        logger.info("Shutdown complete. Goodbye!")
-        sys.exit(0)
     
     signal.signal(signal.SIGTERM, shutdown_handler)
     signal.signal(signal.SIGINT, shutdown_handler)
@@ -239,12 +342,24 @@ def main():
         manager.run(
             poll_interval_ms=poll_interval_ms,
             cleanup_interval_hours=cleanup_hours,
+            batch_rows=batch_rows,
+            batch_latency_ms=batch_latency_ms,
         )
     except Exception as e:
         logger.error(f"Fatal error in collection loop: {e}", exc_info=True)
         # exc_info=True includes the full stack trace in the log
+        manager.flush()
         storage.close()
         sys.exit(1)
+    
+    # ---- Graceful shutdown (run() returned after stop()) ----
+    # Stop the API server
+    api_server.shutdown()
+    
+    # Close the database connection
+    storage.close()
+    
+    logger.info("Shutdown complete. Goodbye!")
 
 if __name__ == "__main__":
     main()
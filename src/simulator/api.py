@@ -2,15 +2,61 @@
 
 import json                          # For JSON serialization
 import logging                       # For structured logging
+import re                            # For matching parameterized URL routes
 import threading                     # To run the server in a background thread
-from http.server import HTTPServer, BaseHTTPRequestHandler  # Built-in HTTP server
+import time                          # For response cache expiry
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # Built-in HTTP server
 from urllib.parse import urlparse, parse_qs  # For parsing URL paths and query strings
 
 logger = logging.getLogger(__name__)
 
 
+# ---- Response Cache ----
+# A dashboard polling /readings, /alarms and per-tag endpoints every second
+# would otherwise re-run the same "latest per sensor" query for each request.
+# Entries are (created_at, generation, data). An entry is reused while it is
+# younger than the TTL AND the write generation hasn't moved — so a fresh
+# flush from SensorManager is visible immediately.
+
+CACHE_TTL_SECONDS = 0.5
+_cache: dict = {}
+
+# ---- JSON Encoders ----
+# Built once and reused. Responses are compact by default (no indentation,
+# no spaces after separators) — machine clients don't need whitespace and
+# pretty-printing roughly doubles the payload. Humans can add ?pretty=1.
+_COMPACT_ENCODER = json.JSONEncoder(separators=(",", ":"))
+_PRETTY_ENCODER = json.JSONEncoder(indent=2)
+
+# Streamed responses (/history) are flushed to the socket in pieces of
+# about this many bytes
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _cached(key: str, producer, generation=None, ttl: float = CACHE_TTL_SECONDS):
+    """Return the cached value for key, or call producer() and cache it."""
+    now = time.monotonic()
+    entry = _cache.get(key)
+    if entry is not None and entry[1] == generation and now - entry[0] < ttl:
+        return entry[2]
+    data = producer()
+    _cache[key] = (now, generation, data)
+    # A single dict assignment is atomic, so concurrent request threads can
+    # at worst both compute the value — never see a half-written entry
+    return data
+
+
 class SensorAPIHandler(BaseHTTPRequestHandler):
     
+    # HTTP/1.1 keeps connections open between requests (keep-alive), so a
+    # dashboard polling every second reuses one TCP connection instead of
+    # paying a handshake per request. Requires every response to carry a
+    # Content-Length header — _send_body always sets it.
+    protocol_version = "HTTP/1.1"
+    
+    # Close keep-alive connections that sit idle this long (seconds), so
+    # abandoned clients don't each pin a request thread forever
+    timeout = 60
     
     def do_GET(self):
       
@@ -18,48 +64,29 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
         parsed = urlparse(self.path)
         path = parsed.path.rstrip("/")  # Remove trailing slash
         # parse_qs parses query parameters: "?hours=2" → {"hours": ["2"]}
-        query_params = parse_qs(parsed.query)
+        self.query_params = parse_qs(parsed.query)
         
-        # Route to the appropriate handler
-        # We use a simple if/elif chain instead of a routing framework
+        # Route to the appropriate handler using the tables built at import
+        # (see _EXACT_ROUTES / _PATTERN_ROUTES below the class)
         try:
-            if path == "/health":
-                self._handle_health()
-            
-            elif path == "/readings":
-                self._handle_readings()
-            
-            elif path.startswith("/readings/"):
-                # Path like: /readings/SEP-V100/inlet_pressure
-                parts = path.split("/")
-                # split("/") on "/readings/SEP-V100/inlet_pressure" gives:
-                # ["", "readings", "SEP-V100", "inlet_pressure"]
-                if len(parts) == 4:
-                    device_id = parts[2]
-                    tag_name = parts[3]
-                    self._handle_reading_detail(device_id, tag_name)
-                else:
-                    self._send_error(400, "Expected /readings/{device_id}/{tag_name}")
-            
-            elif path.startswith("/history/"):
-                parts = path.split("/")
-                if len(parts) == 4:
-                    device_id = parts[2]
-                    tag_name = parts[3]
-                    # Get 'hours' from query params, default to 1.0
-                    hours = float(query_params.get("hours", ["1.0"])[0])
-                    self._handle_history(device_id, tag_name, hours)
-                else:
-                    self._send_error(400, "Expected /history/{device_id}/{tag_name}")
-            
-            elif path == "/stats":
-                self._handle_stats()
+            # Fixed paths like /health are a single dict lookup
+            handler = _EXACT_ROUTES.get(path)
+            if handler is not None:
+                handler(self)
+                return
             
-            elif path == "/alarms":
-                self._handle_alarms()
+            # Parameterized paths like /readings/SEP-V100/inlet_pressure
+            # need one regex match to pull out device_id and tag_name
+            for prefix, pattern, handler, usage in _PATTERN_ROUTES:
+                if path.startswith(prefix):
+                    match = pattern.match(path)
+                    if match:
+                        handler(self, *match.groups())
+                    else:
+                        self._send_error(400, usage)
+                    return
             
-            else:
-                self._send_error(404, f"Unknown endpoint: {path}")
+            self._send_error(404, f"Unknown endpoint: {path}")
         
         except Exception as e:
             logger.error(f"Error handling {self.path}: {e}")
@@ -67,6 +94,23 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
     
     def _handle_health(self):
         
+        # Orchestrators probe /health constantly. Both the payload and its
+        # encoded bytes are rebuilt at most once per TTL, so a cache hit is
+        # just a socket write — no dict building, no JSON encoding.
+        health, status_code, body = _cached("health", self._build_health_response)
+        if self._wants_pretty():
+            self._send_json(health, status_code)
+        else:
+            self._send_body(body, status_code)
+    
+    def _build_health_response(self) -> tuple[dict, int, bytes]:
+        """Health payload, its HTTP status and its compact encoded body."""
+        health = self._build_health()
+        status_code = 200 if health["status"] == "healthy" else 503
+        return health, status_code, _COMPACT_ENCODER.encode(health).encode("utf-8")
+    
+    def _build_health(self) -> dict:
+        
         storage = self.server.storage
         sensor_manager = self.server.sensor_manager
         
@@ -75,7 +119,7 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
         db_writable = storage.is_writable() if storage else False
         stats = storage.get_stats() if storage else {}
         
-        health = {
+        return {
             "status": "healthy" if (collecting and db_writable) else "degraded",
             "collecting": collecting,
             "database_writable": db_writable,
@@ -85,18 +129,15 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
             "database_size_mb": stats.get("database_size_mb", 0.0),
             "uptime_seconds": sensor_manager.uptime if sensor_manager else 0,
         }
-        
-        status_code = 200 if health["status"] == "healthy" else 503
-        self._send_json(health, status_code)
     
     def _handle_readings(self):
         
-        readings = self.server.storage.get_latest()
+        readings = self._latest_readings()
         self._send_json({"readings": readings, "count": len(readings)})
     
     def _handle_reading_detail(self, device_id: str, tag_name: str):
        
-        readings = self.server.storage.get_latest()
+        readings = self._latest_readings()
         # Filter for the specific sensor
         matching = [
             r for r in readings
@@ -109,8 +150,25 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
         else:
             self._send_error(404, f"No readings for {device_id}/{tag_name}")
     
-    def _handle_history(self, device_id: str, tag_name: str, hours: float):
+    def _handle_history(self, device_id: str, tag_name: str):
        
+        # Get 'hours' from query params, default to 1.0
+        hours = float(self.query_params.get("hours", ["1.0"])[0])
+        
+        # ?format=columns: column names once plus one array per row,
+        # encoded by the storage layer straight from the SQLite tuples —
+        # the cheapest form for clients fetching long histories
+        if self.query_params.get("format", [""])[0] == "columns":
+            self._send_body(
+                self.server.storage.get_history_json(device_id, tag_name, hours)
+            )
+            return
+        
+        if not self._wants_pretty():
+            self._stream_history(device_id, tag_name, hours)
+            return
+        
+        # Pretty output is for humans — build the whole response in one go
         readings = self.server.storage.get_history(device_id, tag_name, hours)
         self._send_json({
             "device_id": device_id,
@@ -120,6 +178,57 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
             "count": len(readings),
         })
     
+    def _stream_history(self, device_id: str, tag_name: str, hours: float):
+        """
+        Send /history as a chunked response while rows come out of SQLite.
+        
+        A 24-hour history at 1 Hz is 86,400 rows. Instead of building all
+        of them into one list and one giant JSON string, each row is
+        encoded as it's fetched and sent in ~64 KB HTTP chunks. Memory
+        stays flat and the first bytes reach the client right away.
+        The JSON is identical to the non-streamed response.
+        """
+        encode = _COMPACT_ENCODER.encode
+        rows = self.server.storage.iter_history(device_id, tag_name, hours)
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        # Chunked transfer encoding: the body is sent as length-prefixed
+        # pieces, so we don't need to know the Content-Length up front
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        
+        # Once headers are out we can't switch to an error response —
+        # on failure, log it and drop the connection so the client sees
+        # a truncated body rather than a corrupt one
+        try:
+            buffer = [
+                f'{{"device_id":{encode(device_id)},"tag_name":{encode(tag_name)},'
+                f'"hours":{encode(hours)},"readings":['
+            ]
+            size = len(buffer[0])
+            count = 0
+            for row in rows:
+                piece = encode(row) if count == 0 else "," + encode(row)
+                buffer.append(piece)
+                size += len(piece)
+                count += 1
+                if size >= _STREAM_CHUNK_BYTES:
+                    self._write_chunk("".join(buffer))
+                    buffer = []
+                    size = 0
+            buffer.append(f'],"count":{count}}}')
+            self._write_chunk("".join(buffer))
+            self.wfile.write(b"0\r\n\r\n")  # Zero-length chunk ends the body
+        except Exception as e:
+            logger.error(f"Error streaming {self.path}: {e}")
+            self.close_connection = True
+    
+    def _write_chunk(self, text: str):
+        """Write one HTTP/1.1 chunk: hex length, CRLF, data, CRLF."""
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+    
     def _handle_stats(self):
         """GET /stats — Database and system statistics."""
         stats = self.server.storage.get_stats()
@@ -127,19 +236,54 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
     
     def _handle_alarms(self):
         
-        readings = self.server.storage.get_latest()
-        alarms = [r for r in readings if r["alarm_state"] != "Normal"]
+        sensor_manager = self.server.sensor_manager
+        if sensor_manager:
+            # The manager tracks alarm transitions as readings arrive,
+            # so this needs no scan and no database query. Same keys and
+            # unrounded values as the get_latest() rows /readings serves
+            # (to_dict() would round value to 4 dp). These are the live
+            # readings, so /alarms can be ahead of /readings by the time
+            # a batch waits to be written plus the response cache TTL.
+            alarms = [
+                {
+                    "device_id": r.device_id,
+                    "tag_name": r.tag_name,
+                    "value": r.value,
+                    "unit": r.unit,
+                    "quality": r.quality.value,
+                    "alarm_state": r.alarm_state.value,
+                    "timestamp": r.timestamp,
+                }
+                for r in sensor_manager.active_alarms()
+            ]
+            alarms.sort(key=lambda r: (r["device_id"], r["tag_name"]))
+        else:
+            readings = self._latest_readings()
+            alarms = [r for r in readings if r["alarm_state"] != "Normal"]
         self._send_json({"alarms": alarms, "count": len(alarms)})
     
     # ---- Helper Methods ----
     
+    def _latest_readings(self) -> list[dict]:
+        """Latest reading per sensor, shared across endpoints via the cache."""
+        sensor_manager = self.server.sensor_manager
+        generation = sensor_manager.write_generation if sensor_manager else None
+        return _cached("latest", self.server.storage.get_latest, generation)
+    
+    def _wants_pretty(self) -> bool:
+        """True if the client asked for indented JSON (?pretty=1)."""
+        return self.query_params.get("pretty", ["0"])[0] in ("1", "true")
+    
     def _send_json(self, data: dict, status_code: int = 200):
         """Send a JSON response with proper headers."""
-        response_body = json.dumps(data, indent=2).encode("utf-8")
-        # json.dumps: Convert dict to JSON string
-        # indent=2: Pretty-print with 2-space indentation
+        encoder = _PRETTY_ENCODER if self._wants_pretty() else _COMPACT_ENCODER
+        response_body = encoder.encode(data).encode("utf-8")
+        # encoder.encode: Convert dict to JSON string
         # .encode("utf-8"): Convert string to bytes (HTTP sends bytes)
-        
+        self._send_body(response_body, status_code)
+    
+    def _send_body(self, response_body: bytes, status_code: int = 200):
+        """Send an already-encoded JSON body with proper headers."""
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(response_body)))
@@ -158,9 +302,43 @@ class SensorAPIHandler(BaseHTTPRequestHandler):
             logger.debug(f"API: {message}")
 
 
-def start_api_server(host: str, port: int, storage, sensor_manager) -> HTTPServer:
+# ---- Route Tables ----
+# Built once at import time. Exact paths map straight to their handler;
+# parameterized paths are (prefix, compiled regex, handler, usage message).
+# The prefix lets a malformed path like /readings/SEP-V100 get a helpful
+# 400 instead of a generic 404.
+
+_EXACT_ROUTES = {
+    "/health": SensorAPIHandler._handle_health,
+    "/readings": SensorAPIHandler._handle_readings,
+    "/stats": SensorAPIHandler._handle_stats,
+    "/alarms": SensorAPIHandler._handle_alarms,
+}
+
+_PATTERN_ROUTES = [
+    ("/readings/", re.compile(r"^/readings/([^/]+)/([^/]+)$"),
+     SensorAPIHandler._handle_reading_detail,
+     "Expected /readings/{device_id}/{tag_name}"),
+    ("/history/", re.compile(r"^/history/([^/]+)/([^/]+)$"),
+     SensorAPIHandler._handle_history,
+     "Expected /history/{device_id}/{tag_name}"),
+]
+
+
+class SensorAPIServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer tuned for many concurrent monitoring clients."""
+    
+    daemon_threads = True       # Request threads must not keep the process alive
+    request_queue_size = 128    # listen() backlog — the default of 5 resets
+                                # connections when a burst of scrapers connect
+
+
+def start_api_server(host: str, port: int, storage, sensor_manager) -> SensorAPIServer:
    
-    server = HTTPServer((host, port), SensorAPIHandler)
+    # ThreadingHTTPServer dispatches each connection to its own thread, so a
+    # slow /history query no longer blocks /health probes or dashboard polls.
+    # A plain HTTPServer would serve clients one at a time.
+    server = SensorAPIServer((host, port), SensorAPIHandler)
     
     # Attach our storage and manager to the server instance
     # The request handler accesses these via self.server.storage
@@ -20,9 +20,11 @@ HOW TO READ THIS FILE:
 
 import math        # For sine waves (cycling) and mathematical functions
 import random      # For noise injection and random anomaly timing
+import sys         # For sys.intern (shared identity strings)
 import time        # For timestamps
 from enum import Enum     # For quality codes and alarm states
 from dataclasses import dataclass, field  # For clean data structures
+from typing import Optional  # For type hints with optional values
 
 
 # ============================================================================
@@ -63,7 +65,7 @@ class AlarmState(str, Enum):
     HIHI = "HiHi"       # High-High: critically high
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SensorReading:
     """
     One data point from one sensor at one moment in time.
@@ -76,6 +78,12 @@ class SensorReading:
     dataclass automatically creates __init__, __repr__, and other
     methods from the field definitions. It's a clean way to define
     data structures without writing boilerplate code.
+    
+    slots=True stores the fields in fixed slots instead of a per-instance
+    __dict__ — thousands of readings sit in the write buffer at once, so
+    the memory saving adds up. frozen=True makes readings immutable, which
+    matters because the same object is shared between the write buffer
+    and the API's active-alarm view on another thread.
     """
     device_id: str          # Which device produced this reading (e.g., "SEP-V100")
     tag_name: str           # Which measurement (e.g., "inlet_pressure")
@@ -104,6 +112,59 @@ class SensorReading:
         }
 
 
+# Last (second, "YYYY-MM-DDTHH:MM:SS") pair formatted. Kept as one tuple so
+# a reader on another thread never sees a second paired with the wrong prefix.
+_timestamp_memo: tuple[int, str] = (-1, "")
+
+
+def format_timestamp(t: float) -> str:
+    """
+    Format a time.time() value as an ISO 8601 UTC string with milliseconds.
+    
+    Example: 1771065000.123 → "2026-02-14T10:30:00.123Z"
+    
+    The collection loop calls this once per cycle and passes the result
+    to every sensor's read(), instead of each sensor formatting its own.
+    
+    The date/time part only changes once a second, but gmtime + strftime
+    is the expensive bit. So the formatted prefix is memoized per whole
+    second and only the milliseconds are formatted on every call.
+    """
+    global _timestamp_memo
+    total_ms = int(t * 1000)
+    second, ms = divmod(total_ms, 1000)
+    # Split seconds and millis from the same integer so rounding can never
+    # pair ".000" with the previous second
+    memo_second, prefix = _timestamp_memo
+    if second != memo_second:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        # time.gmtime() converts epoch seconds to a UTC struct_time
+        _timestamp_memo = (second, prefix)
+    return f"{prefix}.{ms:03d}Z"
+
+
+def _reads_until(rng: random.Random, probability: float) -> float:
+    """
+    Sample how many readings until an event with a fixed per-reading
+    chance next happens (counting the reading it happens on).
+    
+    Rolling random() < p on every reading and counting down a number
+    drawn from this (geometric) distribution give exactly the same event
+    statistics — but the countdown costs one RNG draw per EVENT instead
+    of one per READING. For rare events like a 0.1% freeze that is ~1000x
+    fewer draws.
+    
+    Returns math.inf for events that can never happen (probability <= 0).
+    """
+    if probability <= 0.0:
+        return math.inf
+    if probability >= 1.0:
+        return 1
+    # Inverse-CDF sampling: P(K > k) = (1-p)^k, so K = floor(ln U / ln(1-p)) + 1
+    # 1.0 - random() is in (0, 1], so the log is always defined
+    return int(math.log(1.0 - rng.random()) / math.log1p(-probability)) + 1
+
+
 # ============================================================================
 # BASE SENSOR CLASS
 # ============================================================================
@@ -121,9 +182,35 @@ class BaseSensor:
     
     Subclasses only need to implement generate_value() to define
     how the physical measurement behaves over time.
+    
+    Sensors declare __slots__: each instance stores its fields in a fixed
+    array instead of a per-object __dict__. That makes a sensor roughly
+    half the size and its attribute access a little faster — which adds up
+    when a gateway simulates hundreds of them. Subclasses list only the
+    fields they add, and must list every new self.<field> they assign.
     """
     
-    def __init__(self, config: dict):
+    __slots__ = (
+        "_rng",
+        # Identity and operating parameters
+        "device_id", "tag_name", "unit", "nominal", "noise", "_noise_sigma",
+        # Alarm limits, as configured and as ±inf sentinels
+        "alarm_low", "alarm_high", "alarm_lolo", "alarm_hihi",
+        "_limit_hihi", "_limit_high", "_limit_low", "_limit_lolo",
+        "_normal_min", "_normal_max",
+        # Internal state
+        "_quality", "_start_time", "_reading_count",
+        "_anomaly_active", "_anomaly_start", "_anomaly_duration",
+        "_next_anomaly_time",
+        "_freeze_probability", "_is_frozen", "_frozen_value",
+        "_reads_to_freeze", "_reads_to_unfreeze", "_reads_to_bad",
+        "_cached_now", "_cached_reading",
+    )
+    
+    _UNFREEZE_PROBABILITY = 0.02      # ~2% chance per reading to unfreeze
+    _BAD_QUALITY_PROBABILITY = 0.005  # 0.5% chance per reading of a bad value
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
         """
         Initialize a sensor from a configuration dictionary.
         
@@ -141,16 +228,28 @@ class BaseSensor:
                     "alarm_lolo": 600.0,
                     "alarm_hihi": 1100.0,
                 }
+            rng: Random number generator for noise, anomalies and faults.
+                 The collection system shares one across all sensors (and can
+                 seed it for reproducible runs). A private one is created
+                 if not given.
         """
-        # Identity — which device and measurement this sensor represents
-        self.device_id = config["device_id"]
-        self.tag_name = config["tag_name"]
-        self.unit = config["unit"]
+        # Each sensor draws from its own generator instead of the hidden
+        # global one behind random.random(), so runs can be seeded
+        self._rng = rng if rng is not None else random.Random()
+        
+        # Identity — which device and measurement this sensor represents.
+        # sys.intern() makes every copy of e.g. "SEP-V100" one shared string
+        # object: every reading references it, and dict lookups on interned
+        # strings can match by identity before comparing characters.
+        self.device_id = sys.intern(config["device_id"])
+        self.tag_name = sys.intern(config["tag_name"])
+        self.unit = sys.intern(config["unit"])
         
         # Operating parameters
         self.nominal = config["nominal"]     # The "normal" value we oscillate around
         self.noise = config.get("noise", 1.0)  # Random noise amplitude
         # .get("noise", 1.0) means: use config["noise"] if it exists, else use 1.0
+        self._noise_sigma = self.noise * 0.3  # Std dev of the per-reading noise
         
         # Alarm limits — these define the acceptable operating envelope
         self.alarm_low = config.get("alarm_low")     # None if not set
@@ -158,8 +257,19 @@ class BaseSensor:
         self.alarm_lolo = config.get("alarm_lolo")
         self.alarm_hihi = config.get("alarm_hihi")
         
+        # The same limits with "not set" replaced by ±infinity, so the alarm
+        # check never has to test for None: no value is >= +inf or <= -inf,
+        # so a missing limit simply never trips
+        self._limit_hihi = math.inf if self.alarm_hihi is None else self.alarm_hihi
+        self._limit_high = math.inf if self.alarm_high is None else self.alarm_high
+        self._limit_low = -math.inf if self.alarm_low is None else self.alarm_low
+        self._limit_lolo = -math.inf if self.alarm_lolo is None else self.alarm_lolo
+        # The Normal band: strictly between the tightest low-side limit and
+        # the tightest high-side limit (see _check_alarm)
+        self._normal_min = max(self._limit_low, self._limit_lolo)
+        self._normal_max = min(self._limit_high, self._limit_hihi)
+        
         # Internal state
-        self._current_value = self.nominal   # Start at the nominal value
         self._quality = QualityCode.GOOD     # Start healthy
         self._start_time = time.time()       # When the sensor was created
         self._reading_count = 0              # How many readings generated
@@ -168,7 +278,7 @@ class BaseSensor:
         self._anomaly_active = False         # Is an anomaly currently happening?
         self._anomaly_start = 0.0            # When did the current anomaly start?
         self._anomaly_duration = 0.0         # How long will this anomaly last?
-        self._next_anomaly_time = time.time() + random.uniform(300, 600)
+        self._next_anomaly_time = time.time() + self._rng.uniform(300, 600)
         # First anomaly happens 5-10 minutes after startup
         # random.uniform(a, b) returns a random float between a and b
         
@@ -180,8 +290,23 @@ class BaseSensor:
         # 0.1% chance per reading of entering freeze mode
         self._is_frozen = False
         self._frozen_value = 0.0
-    
-    def read(self) -> SensorReading:
+        
+        # Rare per-reading events are scheduled as countdowns instead of
+        # rolling the dice on every read (see _reads_until): readings left
+        # until the next freeze, unfreeze, and bad-quality glitch
+        self._reads_to_freeze = _reads_until(self._rng, self._freeze_probability)
+        self._reads_to_unfreeze = 0
+        self._reads_to_bad = _reads_until(self._rng, self._BAD_QUALITY_PROBABILITY)
+        
+        # Per-cycle reading cache: read() called again with the same cycle
+        # time returns the reading it already produced instead of drawing
+        # fresh noise (which would also give two different "values" for
+        # one instant)
+        self._cached_now: Optional[float] = None
+        self._cached_reading: Optional[SensorReading] = None
+    
+    def read(self, now: Optional[float] = None,
+             timestamp: Optional[str] = None) -> SensorReading:
         """
         Generate one sensor reading.
         
@@ -195,79 +320,138 @@ class BaseSensor:
         6. Check alarm limits
         7. Package into a SensorReading with timestamp and quality
         
+        Args:
+            now: Cycle time from time.time(). The collection loop samples
+                 the clock once per cycle and hands it to every sensor, so
+                 all readings in a cycle describe the same instant.
+                 Defaults to the current time when called on its own.
+            timestamp: Pre-formatted ISO 8601 string for this cycle (see
+                       format_timestamp). Formatting it once per cycle saves
+                       every sensor doing the same string work. Formatted
+                       here when not provided.
+        
         Returns:
-            SensorReading with all fields populated
+            SensorReading with all fields populated. Repeated calls with
+            the same `now` return the same reading object.
         """
+        if now is None:
+            now = time.time()
+        elif now == self._cached_now:
+            return self._cached_reading  # Already read this cycle
+        self._cached_now = now
         self._reading_count += 1
-        now = time.time()
-        elapsed = now - self._start_time  # Seconds since sensor started
+        if timestamp is None:
+            timestamp = format_timestamp(now)
+        
+        # Every reading touches the same handful of attributes. Loading each
+        # into a local once and working on the locals is noticeably faster
+        # in CPython (locals are an array index, attributes a lookup), and
+        # state is only written back to self when it actually changes.
+        rng = self._rng
+        quality = self._quality
         
         # --- Sensor freeze simulation ---
-        # Check if we should enter freeze mode (random probability)
-        if not self._is_frozen and random.random() < self._freeze_probability:
-            # random.random() returns 0.0 to 1.0
-            # If freeze_probability is 0.001, there's a 0.1% chance per reading
-            self._is_frozen = True
-            self._frozen_value = self._current_value
-            self._quality = QualityCode.UNCERTAIN
-            # We set UNCERTAIN, not BAD, because the sensor THINKS it's fine
-            # A frozen sensor is hard to detect — the value looks plausible
-        
-        # Unfreeze after 30-120 seconds (simulating intermittent failure)
-        if self._is_frozen:
-            if random.random() < 0.02:  # ~2% chance per reading to unfreeze
+        # Count down to the next freeze (on average one in 1/freeze_probability
+        # readings — with 0.001, one reading in a thousand)
+        is_frozen = self._is_frozen
+        if not is_frozen:
+            reads_to_freeze = self._reads_to_freeze - 1
+            self._reads_to_freeze = reads_to_freeze
+            if reads_to_freeze <= 0:
+                self._is_frozen = is_frozen = True
+                # Stick at the last value reported (nominal before the first)
+                last = self._cached_reading
+                self._frozen_value = self.nominal if last is None else last.value
+                self._quality = quality = QualityCode.UNCERTAIN
+                # We set UNCERTAIN, not BAD, because the sensor THINKS it's fine
+                # A frozen sensor is hard to detect — the value looks plausible
+                self._reads_to_unfreeze = _reads_until(rng, self._UNFREEZE_PROBABILITY)
+        
+        # Unfreeze after ~50 readings on average (simulating intermittent failure)
+        if is_frozen:
+            reads_to_unfreeze = self._reads_to_unfreeze - 1
+            self._reads_to_unfreeze = reads_to_unfreeze
+            if reads_to_unfreeze <= 0:
                 self._is_frozen = False
-                self._quality = QualityCode.GOOD
+                self._quality = quality = QualityCode.GOOD
+                self._reads_to_freeze = _reads_until(rng, self._freeze_probability)
             else:
                 # Return the frozen value (same value every time)
-                return self._make_reading(self._frozen_value)
+                reading = self._make_reading(self._frozen_value, timestamp)
+                self._cached_reading = reading
+                return reading
         
         # --- Anomaly management ---
         # Check if it's time to start a new anomaly
-        if not self._anomaly_active and now >= self._next_anomaly_time:
-            self._anomaly_active = True
-            self._anomaly_start = now
-            self._anomaly_duration = random.uniform(120, 360)  # 2-6 minutes
-        
+        anomaly_active = self._anomaly_active
+        if not anomaly_active:
+            if now >= self._next_anomaly_time:
+                self._anomaly_active = anomaly_active = True
+                self._anomaly_start = now
+                self._anomaly_duration = rng.uniform(120, 360)  # 2-6 minutes
         # Check if current anomaly should end
-        if self._anomaly_active:
-            if now - self._anomaly_start >= self._anomaly_duration:
-                self._anomaly_active = False
-                # Schedule next anomaly: 5-15 minutes from now
-                self._next_anomaly_time = now + random.uniform(300, 900)
+        elif now - self._anomaly_start >= self._anomaly_duration:
+            self._anomaly_active = anomaly_active = False
+            # Schedule next anomaly: 5-15 minutes from now
+            self._next_anomaly_time = now + rng.uniform(300, 900)
         
         # --- Generate the base value ---
         # This is where subclasses provide their specific behavior
         # (pressure drift, temperature cycling, vibration patterns, etc.)
-        base_value = self.generate_value(elapsed)
+        # Elapsed = seconds since sensor started
+        base_value = self.generate_value(now - self._start_time)
         
         # --- Add random noise ---
         # Every real sensor has some noise. A pressure transmitter rated
         # for ±0.1% accuracy at 1000 PSI has ±1 PSI of noise.
-        noise = random.gauss(0, self.noise * 0.3)
-        # random.gauss(mean, std_dev) generates normally distributed noise
+        value = base_value + rng.gauss(0.0, self._noise_sigma)
+        # random.gauss(mean, std_dev) generates normally distributed noise.
+        # It computes normals in Box-Muller pairs and keeps the second one
+        # for the next call, so no draws are wasted.
         # Using gaussian (bell curve) because real sensor noise follows
         # a normal distribution, not uniform distribution
         
-        value = base_value + noise
-        
         # --- Apply anomaly effects ---
-        if self._anomaly_active:
+        if anomaly_active:
             value = self.apply_anomaly(value, now - self._anomaly_start)
         
         # --- Occasional bad quality reading ---
         # Real sensors occasionally return bad data (communication error,
         # electrical interference, sensor recalibration)
-        if random.random() < 0.005:  # 0.5% chance
-            self._quality = QualityCode.BAD
+        reads_to_bad = self._reads_to_bad - 1
+        if reads_to_bad <= 0:  # 0.5% of readings on average
+            reads_to_bad = _reads_until(rng, self._BAD_QUALITY_PROBABILITY)
+            self._quality = quality = QualityCode.BAD
             # On a bad reading, the value might be wildly wrong
-            value = self.nominal + random.uniform(-50, 50)
-        elif self._quality == QualityCode.BAD:
+            value = self.nominal + rng.uniform(-50, 50)
+        elif quality is QualityCode.BAD:
             # Recover from bad quality on next reading
-            self._quality = QualityCode.GOOD
-        
-        self._current_value = value
-        return self._make_reading(value)
+            # (enum members are singletons, so "is" is an exact and cheaper
+            # test than ==, which on a str Enum falls back to str comparison)
+            self._quality = quality = QualityCode.GOOD
+        self._reads_to_bad = reads_to_bad
+        
+        # --- Package the reading ---
+        # Same as _make_reading(), inlined: this is the path almost every
+        # reading takes, and the in-band alarm test settles most of them
+        # without calling _check_alarm()
+        if self._normal_min < value < self._normal_max:
+            alarm_state = AlarmState.NORMAL
+        else:
+            alarm_state = self._check_alarm(value)
+        # Positional arguments in SensorReading's field order — skips the
+        # keyword matching that a call with name=value pairs has to do
+        reading = SensorReading(
+            self.device_id, self.tag_name, value, self.unit,
+            quality, alarm_state, timestamp,
+        )
+        self._cached_reading = reading
+        return reading
+    
+    @property
+    def reading_count(self) -> int:
+        """Readings generated so far (repeat reads within a cycle don't count)."""
+        return self._reading_count
     
     def generate_value(self, elapsed_seconds: float) -> float:
         """
@@ -310,26 +494,28 @@ class BaseSensor:
         Returns:
             The highest priority alarm state that applies
         """
+        # Fast path: almost every reading is inside the Normal band, and
+        # one chained comparison settles that
+        if self._normal_min < value < self._normal_max:
+            return AlarmState.NORMAL
         # Check critical alarms first
-        if self.alarm_hihi is not None and value >= self.alarm_hihi:
+        if value >= self._limit_hihi:
             return AlarmState.HIHI
-        if self.alarm_lolo is not None and value <= self.alarm_lolo:
+        if value <= self._limit_lolo:
             return AlarmState.LOLO
         # Then warning alarms
-        if self.alarm_high is not None and value >= self.alarm_high:
+        if value >= self._limit_high:
             return AlarmState.HIGH
-        if self.alarm_low is not None and value <= self.alarm_low:
+        if value <= self._limit_low:
             return AlarmState.LOW
-        return AlarmState.NORMAL
+        return AlarmState.NORMAL  # NaN lands here, as before
     
-    def _make_reading(self, value: float) -> SensorReading:
+    def _make_reading(self, value: float, timestamp: str) -> SensorReading:
         """
         Package a value into a complete SensorReading.
         
         Adds: timestamp, quality code, alarm state
         """
-        from datetime import datetime, timezone
-        
         return SensorReading(
             device_id=self.device_id,
             tag_name=self.tag_name,
@@ -337,10 +523,7 @@ class BaseSensor:
             unit=self.unit,
             quality=self._quality,
             alarm_state=self._check_alarm(value),
-            # ISO 8601 timestamp with UTC timezone
-            # Example: "2026-02-14T10:30:00.000Z"
-            timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") +
-                      f"{datetime.now(timezone.utc).microsecond // 1000:03d}Z",
+            timestamp=timestamp,
         )
 
 
@@ -362,24 +545,32 @@ class PressureSensor(BaseSensor):
     with increasing amplitude. This is a classic control loop problem.
     """
     
-    def __init__(self, config: dict):
-        super().__init__(config)
-        # super().__init__(config) calls BaseSensor.__init__(config)
+    __slots__ = ("drift_rate", "oscillation_period", "oscillation_amplitude",
+                 "_omega_osc")
+    
+    _OMEGA_ANOMALY = 2 * math.pi / 15  # 15-second anomaly oscillation (rad/s)
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
+        super().__init__(config, rng)
+        # super().__init__(config, rng) calls BaseSensor.__init__(config, rng)
         # This is how inheritance works: the child class adds its own
         # initialization ON TOP of the parent's initialization
         
         self.drift_rate = config.get("drift_rate", 0.001)  # PSI per second drift
         self.oscillation_period = config.get("oscillation_period", 120)  # seconds
         self.oscillation_amplitude = config.get("oscillation_amplitude", 3.0)  # PSI
+        
+        # Angular frequency (radians/second) of the oscillation. sin(2π·t/T)
+        # is sin(ω·t) with ω = 2π/T — computing ω once here saves a
+        # multiply and a divide on every reading.
+        self._omega_osc = 2 * math.pi / self.oscillation_period
     
     def generate_value(self, elapsed: float) -> float:
         """Generate realistic pressure behavior."""
       
         drift = self.drift_rate * elapsed * math.sin(elapsed / 3600)
         
-        oscillation = self.oscillation_amplitude * math.sin(
-            2 * math.pi * elapsed / self.oscillation_period
-        )
+        oscillation = self.oscillation_amplitude * math.sin(self._omega_osc * elapsed)
       
         return self.nominal + drift + oscillation
     
@@ -399,7 +590,7 @@ class PressureSensor(BaseSensor):
         # After 300 seconds: 5 + 15 = 20 PSI swing
         
         oscillation = growing_amplitude * math.sin(
-            2 * math.pi * anomaly_elapsed / 15  # Fast 15-second oscillation
+            self._OMEGA_ANOMALY * anomaly_elapsed  # Fast 15-second oscillation
         )
         return value + oscillation
 
@@ -417,19 +608,34 @@ class TemperatureSensor(BaseSensor):
     anomaly duration, showing as a persistent upward trend.
     """
     
-    def __init__(self, config: dict):
-        super().__init__(config)
+    __slots__ = ("daily_amplitude", "_daily_cache_t", "_daily_cache_v")
+    
+    _OMEGA_DAILY = 2 * math.pi / 86400  # One cycle per day (rad/s)
+    _DAILY_REFRESH = 60.0               # Recompute the daily cycle every minute
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
+        super().__init__(config, rng)
         self.daily_amplitude = config.get("daily_amplitude", 5.0)  # °C daily swing
+        
+        # The daily cycle moves at most ~0.02°C per minute (for a 5°C swing),
+        # far below sensor noise, so it's recomputed once a minute and the
+        # cached value reused in between
+        self._daily_cache_t = -math.inf  # elapsed time of the cached value
+        self._daily_cache_v = 0.0
     
     def generate_value(self, elapsed: float) -> float:
         """Generate realistic temperature with daily cycling."""
         # Daily thermal cycle: temperature rises during "day" and falls at "night"
         # 86400 seconds = 24 hours
-        daily_cycle = self.daily_amplitude * math.sin(
-            2 * math.pi * elapsed / 86400
-        )
-        
-        # Very slow drift (temperature trends change over days, not minutes)
+        # abs() so a wall-clock step backwards also forces a refresh
+        if abs(elapsed - self._daily_cache_t) >= self._DAILY_REFRESH:
+            self._daily_cache_v = self.daily_amplitude * math.sin(self._OMEGA_DAILY * elapsed)
+            self._daily_cache_t = elapsed
+        daily_cycle = self._daily_cache_v
+        
+        # Very slow drift (temperature trends change over days, not minutes).
+        # Not cached like the daily cycle: its amplitude grows with elapsed,
+        # so after a day a one-minute-old value would be off by ~0.3°C.
         slow_drift = 0.0005 * elapsed * math.sin(elapsed / 7200)
         
         return self.nominal + daily_cycle + slow_drift
@@ -456,11 +662,21 @@ class FlowSensor(BaseSensor):
     platforms that can trip separators and cause shutdowns.
     """
     
-    def __init__(self, config: dict):
-        super().__init__(config)
+    __slots__ = ("decline_rate", "_slug_amplitude")
+    
+    _OMEGA_PULSATION = 2 * math.pi / 30  # 30-second pump pulsation (rad/s)
+    
+    # Slug anomaly shape: a half-sine spike over the first 30% of each cycle
+    _SLUG_CYCLE = 12.0                     # seconds between slugs
+    _SLUG_SPIKE = _SLUG_CYCLE * 0.3        # spike lasts 3.6 s of each cycle
+    _OMEGA_SPIKE = math.pi / _SLUG_SPIKE   # half a sine wave over the spike
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
+        super().__init__(config, rng)
         # Decline rate: how fast production decreases
         # 0.00001 means ~1% decline per day at 86400 seconds
         self.decline_rate = config.get("decline_rate", 0.00001)
+        self._slug_amplitude = self.nominal * 0.5  # Peak slug surge (50% of nominal)
     
     def generate_value(self, elapsed: float) -> float:
         """Generate flow with production decline curve."""
@@ -470,20 +686,22 @@ class FlowSensor(BaseSensor):
         decline = math.exp(-self.decline_rate * elapsed)
         
         # Small flow variations (pump pulsation, valve adjustments)
-        pulsation = 10.0 * math.sin(2 * math.pi * elapsed / 30)  # 30-second cycle
+        pulsation = 10.0 * math.sin(self._OMEGA_PULSATION * elapsed)  # 30-second cycle
         
         return self.nominal * decline + pulsation
     
     def apply_anomaly(self, value: float, anomaly_elapsed: float) -> float:
         """Anomaly: Slug flow — sudden surges in flow rate."""
         # Slug flow creates sharp spikes that repeat every 10-20 seconds
-        slug_cycle = 12.0  # seconds between slugs
         # math.fmod returns the remainder of division (like % but for floats)
-        phase = math.fmod(anomaly_elapsed, slug_cycle) / slug_cycle
-        
-        if phase < 0.3:  # 30% of the cycle is the spike
-            # Sharp spike: flow jumps 50-100% above normal
-            spike = self.nominal * 0.5 * math.sin(math.pi * phase / 0.3)
+        # — here, seconds into the current 12-second slug cycle
+        t = math.fmod(anomaly_elapsed, self._SLUG_CYCLE)
+        
+        if t < self._SLUG_SPIKE:  # 30% of the cycle is the spike
+            # Sharp spike: flow jumps 50-100% above normal.
+            # Working in seconds with precomputed constants gives the same
+            # curve as sin(pi * phase / 0.3) without the two divisions.
+            spike = self._slug_amplitude * math.sin(self._OMEGA_SPIKE * t)
             return value + spike
         return value  # Rest of cycle: normal flow
 
@@ -507,14 +725,19 @@ class VibrationSensor(BaseSensor):
     the bearing during a planned shutdown instead of an emergency.
     """
     
-    def __init__(self, config: dict):
-        super().__init__(config)
+    __slots__ = ("baseline",)
+    
+    _OMEGA_BASE = 2 * math.pi / 45        # 45-second baseline variation (rad/s)
+    _OMEGA_HARMONIC = 2 * _OMEGA_BASE     # 2x harmonic during bearing anomaly
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
+        super().__init__(config, rng)
         self.baseline = config.get("baseline", 1.2)  # mm/s RMS baseline
     
     def generate_value(self, elapsed: float) -> float:
         """Generate baseline vibration level."""
         # Small random variation around baseline (normal machine behavior)
-        variation = 0.1 * math.sin(2 * math.pi * elapsed / 45)
+        variation = 0.1 * math.sin(self._OMEGA_BASE * elapsed)
         return self.baseline + variation
     
     def apply_anomaly(self, value: float, anomaly_elapsed: float) -> float:
@@ -530,12 +753,12 @@ class VibrationSensor(BaseSensor):
         amplitude_increase = anomaly_elapsed * 0.01  # 0.01 mm/s per second
        
         spike = 0.0
-        if random.random() < 0.15:  # 15% chance per reading
-            spike = random.uniform(0.5, 2.0)  # Spike magnitude
+        if self._rng.random() < 0.15:  # 15% chance per reading
+            spike = self._rng.uniform(0.5, 2.0)  # Spike magnitude
         
         # Harmonic content (vibration at 2x and 3x base frequency)
         harmonic = 0.3 * amplitude_increase * math.sin(
-            2 * math.pi * anomaly_elapsed * 2 / 45  # 2x frequency
+            self._OMEGA_HARMONIC * anomaly_elapsed  # 2x frequency
         )
         
         return value + amplitude_increase + spike + harmonic
@@ -556,14 +779,17 @@ class LevelSensor(BaseSensor):
     carryover to the gas outlet (very bad).
     """
     
-    def __init__(self, config: dict):
-        super().__init__(config)
+    __slots__ = ("control_period", "_omega_control")
+    
+    def __init__(self, config: dict, rng: Optional[random.Random] = None):
+        super().__init__(config, rng)
         self.control_period = config.get("control_period", 60)  # seconds
+        self._omega_control = 2 * math.pi / self.control_period  # rad/s
     
     def generate_value(self, elapsed: float) -> float:
         """Generate level with control system behavior."""
         # Level controller keeps level oscillating slightly around setpoint
-        control_action = 2.0 * math.sin(2 * math.pi * elapsed / self.control_period)
+        control_action = 2.0 * math.sin(self._omega_control * elapsed)
         
         # Slow drift from changing inlet conditions
         inlet_effect = 1.0 * math.sin(elapsed / 1800)  # 30-minute cycle
@@ -592,7 +818,7 @@ SENSOR_TYPES = {
 }
 
 
-def create_sensor(config: dict) -> BaseSensor:
+def create_sensor(config: dict, rng: Optional[random.Random] = None) -> BaseSensor:
     """
     Factory function — creates the right sensor type from a config dict.
     
@@ -601,6 +827,7 @@ def create_sensor(config: dict) -> BaseSensor:
     
     Args:
         config: Must include "type" key matching SENSOR_TYPES
+        rng: Optional random generator to hand to the sensor
         
     Returns:
         An instance of the appropriate sensor subclass
@@ -617,5 +844,5 @@ def create_sensor(config: dict) -> BaseSensor:
         )
     
     # SENSOR_TYPES[sensor_type] returns the CLASS (e.g., PressureSensor)
-    # Adding (config) CALLS the class constructor, creating an instance
-    return SENSOR_TYPES[sensor_type](config)
+    # Adding (config, rng) CALLS the class constructor, creating an instance
+    return SENSOR_TYPES[sensor_type](config, rng)